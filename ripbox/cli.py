@@ -3,15 +3,39 @@
 
 from __future__ import annotations
 
+from concurrent.futures import Executor, ThreadPoolExecutor, as_completed
 from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, Mapping, Sequence, TextIO
+import contextlib
+import copy
+import functools
+import io
+import os
+import stat
+import sys
+import threading
+import time
 
-from yt_dlp import YoutubeDL
-from yt_dlp.utils import DownloadError
 from .input_sources import choose_input
-
-from .formats import choose_formats
-from .ytdlp_opts import build_base_opts, build_opts_for_format, cookie_sources
-from .url_checks import quick_url_check, is_networkish_error, is_permanent_unavailable_error
+from .info_cache import load_info, save_info
+
+from .formats import VIDEO_EXTS, choose_formats
+from .ytdlp_opts import (
+    build_base_opts,
+    build_opts_for_format,
+    build_opts_matrix,
+    build_planning_opts,
+    cookie_sources,
+)
+from .url_checks import (
+    is_networkish_error,
+    is_permanent_unavailable_error,
+    precheck_urls,
+    quick_url_check,
+)
+
+if TYPE_CHECKING:
+    from yt_dlp import YoutubeDL
 
 
 # ----------------------------
@@ -22,40 +46,31 @@ def ask(prompt: str) -> str:
         return input(prompt).strip()
     except (EOFError, KeyboardInterrupt):
         return ""
- # ----------------------------
-# tct file read
-# ----------------------------       
-def read_text_from_prompt() -> str:
-    print("→ Paste text / URLs (empty line to start):")
-    lines: list[str] = []
-    while True:
-        line = input()
-        if not line.strip():
-            break
-        lines.append(line)
-    return "\n".join(lines)
-
-
-def read_text_from_file(path: Path) -> str:
-    if not path.exists():
-        raise FileNotFoundError(f"{path.name} not found in project root.")
-    return path.read_text(encoding="utf-8", errors="ignore")
 
 
 # ----------------------------
 # Output directory
 # ----------------------------
+HOME_DOWNLOADS = Path.home() / "Downloads"
+
+
 def resolve_output_dir(user_input: str) -> Path:
-    base = Path.home() / "Downloads"
     if not user_input:
-        out_dir = base
+        out_dir = HOME_DOWNLOADS
     else:
         sub = Path(user_input)
         if sub.is_absolute():
             raise ValueError("Absolute paths are not allowed. Use subfolders only.")
-        out_dir = base / sub
+        out_dir = HOME_DOWNLOADS / sub
 
-    out_dir.mkdir(parents=True, exist_ok=True)
+    # one stat() on the common "already exists" path, mkdir only when missing
+    try:
+        st = os.stat(out_dir)
+    except FileNotFoundError:
+        out_dir.mkdir(parents=True, exist_ok=True)
+    else:
+        if not stat.S_ISDIR(st.st_mode):
+            raise ValueError(f"Not a directory: {out_dir}")
     return out_dir
 
 
@@ -63,47 +78,76 @@ def resolve_output_dir(user_input: str) -> Path:
 # yt-dlp logger capture
 # ----------------------------
 class CaptureLogger:
-    def __init__(self) -> None:
+    """
+    yt-dlp logger. Lines are buffered and written in chunks (every 64 lines
+    or 0.5 s, whichever comes first) instead of one write per message;
+    flush() writes the rest and is called when a download / extraction ends.
+    """
+
+    FLUSH_LINES = 64
+    FLUSH_INTERVAL_S = 0.5
+
+    def __init__(self, prefix: str = "", stream: TextIO | None = None) -> None:
         self.last_error: str | None = None
+        # exports run in parallel -> tag every line with its export
+        self.prefix = prefix
+        # URLs run in parallel -> each URL logs into its own buffer (None = stdout)
+        self.stream = stream
+        # fragment threads may log too -> buffer is guarded
+        self._buf: list[str] = []
+        self._buf_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def _emit(self, line: str) -> None:
+        with self._buf_lock:
+            self._buf.append(line)
+            now = time.monotonic()
+            if len(self._buf) < self.FLUSH_LINES and now - self._last_flush < self.FLUSH_INTERVAL_S:
+                return
+            self._write_locked(now)
+
+    def _write_locked(self, now: float) -> None:
+        if self._buf:
+            (self.stream or sys.stdout).write("".join(self._buf))
+            self._buf.clear()
+        self._last_flush = now
+
+    def flush(self) -> None:
+        with self._buf_lock:
+            self._write_locked(time.monotonic())
 
     def debug(self, msg: str) -> None:
         # yt-dlp često šalje normalne poruke kao "debug" koje počinju s "[youtube]"
         if msg:
-            print(msg)
+            self._emit(f"{self.prefix}{msg}\n")
 
     def warning(self, msg: str) -> None:
         if msg:
-            print(f"WARNING: {msg}")
+            self._emit(f"{self.prefix}WARNING: {msg}\n")
 
     def error(self, msg: str) -> None:
         self.last_error = msg
         if msg:
-            print(f"ERROR: {msg}")
+            self._emit(f"{self.prefix}ERROR: {msg}\n")
 
 
 def _existing_path(p: str | None) -> str | None:
-    if not p:
-        return None
-    try:
-        pp = Path(p)
-        return str(pp) if pp.exists() else None
-    except Exception:
-        return None
+    # os.path.exists: no Path object, never raises (bad paths -> False).
+    # Not memoized: concurrent exports would see stale "missing" entries.
+    return p if p and os.path.exists(p) else None
 
 
-def _collect_candidate_outputs(info: dict, ydl: YoutubeDL) -> list[str]:
+def _candidate_outputs(info: dict, ydl: YoutubeDL) -> Iterator[str | None]:
     """
-    Try multiple known places where yt-dlp stores the final output path.
-    We treat download as success ONLY if at least one candidate exists on disk.
+    Known places where yt-dlp stores the output path, most likely first.
+    Lazy -> prepare_filename only runs if nothing cheaper matched.
     """
-    candidates: list[str] = []
-
     # Common: final path stored here
-    candidates.append(info.get("_filename"))
+    yield info.get("_filename")
 
     # prepare_filename usually yields the output path for the main file
     try:
-        candidates.append(ydl.prepare_filename(info))
+        yield ydl.prepare_filename(info)
     except Exception:
         pass
 
@@ -112,44 +156,78 @@ def _collect_candidate_outputs(info: dict, ydl: YoutubeDL) -> list[str]:
     if isinstance(rd, list):
         for item in rd:
             if isinstance(item, dict):
-                candidates.append(item.get("filepath"))
-                candidates.append(item.get("filename"))
+                yield item.get("filepath")
+                yield item.get("filename")
+
+
+def _collect_candidate_outputs(info: dict, ydl: YoutubeDL) -> list[str]:
+    """
+    Try multiple known places where yt-dlp stores the final output path.
+    We treat download as success ONLY if at least one candidate exists on disk.
+    Returns the first existing one (callers only check for a non-empty list).
+    """
+    seen: set[str] = set()
+
+    def first_existing(candidates: Iterable[str | None]) -> list[str]:
+        # dedup before stat -> one syscall per unique path
+        for c in candidates:
+            if not c or c in seen:
+                continue
+            seen.add(c)
+            ec = _existing_path(c)
+            if ec:
+                return [ec]
+        return []
+
+    found = first_existing(_candidate_outputs(info, ydl))
+    if found:
+        return found
 
     # Playlist case: entries may contain filenames
     entries = info.get("entries")
     if isinstance(entries, list):
         for e in entries[:5]:  # don't blow up on huge playlists
             if isinstance(e, dict):
-                candidates.append(e.get("_filename"))
-                try:
-                    candidates.append(ydl.prepare_filename(e))
-                except Exception:
-                    pass
+                found = first_existing(_candidate_outputs(e, ydl))
+                if found:
+                    return found
 
-    # Dedup + keep only existing
-    seen: set[str] = set()
-    existing: list[str] = []
-    for c in candidates:
-        ec = _existing_path(c)
-        if ec and ec not in seen:
-            seen.add(ec)
-            existing.append(ec)
-
-    return existing
+    return []
 
 
 # ----------------------------
 # yt-dlp wrapper (success + real error string)
 # ----------------------------
-def run_download(url: str, ydl_opts: dict) -> tuple[bool, str | None]:
+# Set on Ctrl+C: downloads running in worker threads (the signal only reaches
+# the main thread) stop at their next progress update.
+_abort = threading.Event()
+
+
+def _abort_hook(_status: dict) -> None:
+    if _abort.is_set():
+        from yt_dlp.utils import DownloadCancelled
+
+        raise DownloadCancelled("Interrupted by user")
+
+
+def _no_retry(err: str | None) -> bool:
+    """
+    Retrying (other cookies / fresh extraction / separate download) can't help:
+    dead link, network trouble, or the user pressed Ctrl+C.
+    """
+    return _abort.is_set() or is_permanent_unavailable_error(err) or is_networkish_error(err)
+
+
+def _capture_opts(ydl_opts: Mapping[str, Any], logger: CaptureLogger) -> dict:
     cf = ydl_opts.get("cookiefile")
     cb = ydl_opts.get("cookiesfrombrowser")
-    print(f"[dbg] cookiefile={cf!r} cookiesfrombrowser={cb!r}")
-
-    logger = CaptureLogger()
+    print(f"{logger.prefix}[dbg] cookiefile={cf!r} cookiesfrombrowser={cb!r}", file=logger.stream)
 
-    opts = dict(ydl_opts)
+    # flatten (per-format opts are ChainMap views); None = key unset,
+    # "_"-keys are ripbox-internal (not yt-dlp params)
+    opts = {k: v for k, v in ydl_opts.items() if v is not None and not k.startswith("_")}
     opts["logger"] = logger
+    opts["progress_hooks"] = [*opts.get("progress_hooks", ()), _abort_hook]
 
     # CRITICAL: do NOT let yt-dlp silently "succeed" on errors
     opts["ignoreerrors"] = False
@@ -159,10 +237,133 @@ def run_download(url: str, ydl_opts: dict) -> tuple[bool, str | None]:
     #max verbose
     #opts["verbose"] = True
 
+    return opts
+
+
+@functools.lru_cache(maxsize=None)
+def _ydl_api() -> tuple[type[YoutubeDL], type[Exception]]:
+    """
+    (YoutubeDL, DownloadError), imported on first use.
+    yt-dlp pulls in hundreds of extractors -> reset / empty input / invalid
+    URLs never pay for it; later calls are a cache hit, not an import.
+    """
+    from yt_dlp import YoutubeDL
+    from yt_dlp.utils import DownloadError
+
+    return (YoutubeDL, DownloadError)
+
+
+class ExtractorPool:
+    """
+    Extraction-only YoutubeDL instances, one per cookie mode, reused for every
+    URL of a batch: the cookie jar, extractor/player-JS caches and HTTP
+    connections stay warm instead of being rebuilt per URL.
+
+    YoutubeDL is not thread-safe -> each worker thread gets its own instances.
+    `attempts` is a long-lived executor for cookie attempts run side by side
+    (its threads keep their instances between URLs too).
+    Call close() when the batch is done.
+    """
+
+    def __init__(self, attempt_workers: int = 1) -> None:
+        self._local = threading.local()
+        self._all: list[YoutubeDL] = []
+        self._all_lock = threading.Lock()
+        self.attempts = ThreadPoolExecutor(
+            max_workers=max(1, attempt_workers), thread_name_prefix="ripbox-attempt"
+        )
+
+    def extract(
+        self,
+        url: str,
+        mode: str,
+        ydl_opts: Mapping[str, Any],
+        prefix: str = "",
+        out: TextIO | None = None,
+    ) -> tuple[dict | None, str | None]:
+        """
+        Run the extractor only (no download) and return a sanitized, JSON-safe info dict.
+        Every export of the URL is then processed from this one extraction.
+        """
+        YoutubeDL, DownloadError = _ydl_api()
+
+        ydls: dict[str, tuple[YoutubeDL, CaptureLogger]] | None = getattr(self._local, "ydls", None)
+        if ydls is None:
+            ydls = self._local.ydls = {}
+
+        entry = ydls.get(mode)
+        if entry is None:
+            logger = CaptureLogger(prefix, out)
+        else:
+            logger = entry[1]
+            logger.prefix = prefix
+            logger.stream = out
+            logger.last_error = None
+
+        try:
+            if entry is None:
+                # constructor can fail (e.g. browser cookie DB missing) ->
+                # that's a failed attempt, and only a working instance is cached
+                entry = (YoutubeDL(_capture_opts(ydl_opts, logger)), logger)
+                ydls[mode] = entry
+                with self._all_lock:
+                    self._all.append(entry[0])
+
+            ydl = entry[0]
+            info = ydl.extract_info(url, download=False)
+            if not isinstance(info, dict):
+                return (None, logger.last_error or "No info extracted.")
+            return (ydl.sanitize_info(info), None)
+
+        except DownloadError as e:
+            return (None, logger.last_error or str(e))
+        except Exception as e:
+            return (None, logger.last_error or str(e))
+        finally:
+            logger.flush()
+
+    def close(self, wait: bool = True) -> None:
+        # attempts still running would use the instances closed below
+        # (wait=False on Ctrl+C: they only fail, nothing is left to use them)
+        self.attempts.shutdown(wait=wait, cancel_futures=True)
+        with self._all_lock:
+            ydls, self._all = self._all, []
+        for ydl in ydls:
+            try:
+                ydl.close()
+            except Exception:
+                pass
+        self._local = threading.local()
+
+
+def run_download(
+    url: str,
+    ydl_opts: Mapping[str, Any],
+    prefix: str = "",
+    info: dict | None = None,
+    post_processors: Sequence[Any] = (),
+    out: TextIO | None = None,
+) -> tuple[bool, str | None]:
+    """
+    Download `url`. With `info` (from ExtractorPool.extract) the extractor is skipped
+    and yt-dlp only does format selection + download + postprocessing.
+    `post_processors` are extra PostProcessor objects run on each final file.
+    """
+    YoutubeDL, DownloadError = _ydl_api()
+
+    logger = CaptureLogger(prefix, out)
+    opts = _capture_opts(ydl_opts, logger)
 
     try:
         with YoutubeDL(opts) as ydl:
-            info = ydl.extract_info(url, download=True)
+            for pp in post_processors:
+                ydl.add_post_processor(pp, when="after_move")
+
+            if info is None:
+                info = ydl.extract_info(url, download=True)
+            else:
+                # process_ie_result mutates the dict; exports share the original
+                info = ydl.process_ie_result(copy.deepcopy(info), download=True)
 
             # If yt-dlp returned nothing, that's not success
             if not isinstance(info, dict):
@@ -184,6 +385,26 @@ def run_download(url: str, ydl_opts: dict) -> tuple[bool, str | None]:
         return (False, logger.last_error or str(e))
     except Exception as e:
         return (False, logger.last_error or str(e))
+    finally:
+        logger.flush()
+
+
+def audio_only_info(info: dict) -> dict:
+    """
+    Narrow `formats` to audio-only streams so "bestaudio/best" doesn't have to
+    look at video formats. Left untouched when the site has no audio-only streams.
+    """
+    formats = info.get("formats")
+    if not isinstance(formats, list):
+        return info
+
+    audio = [
+        f for f in formats
+        if isinstance(f, dict) and f.get("vcodec") == "none" and f.get("acodec") not in (None, "none")
+    ]
+    if not audio:
+        return info
+    return {**info, "formats": audio}
 
 
 def build_cookie_attempts(base_with_cookies: dict) -> list[tuple[str, dict]]:
@@ -200,20 +421,432 @@ def build_cookie_attempts(base_with_cookies: dict) -> list[tuple[str, dict]]:
 
     return attempts
 
-def normalize_url(raw: str) -> str:
-    s = (raw or "").strip()
 
-    # If terminal escape junk or other prefix exists, salvage first http(s)
-    for proto in ("https://", "http://"):
-        idx = s.find(proto)
-        if idx > 0:
-            s = s[idx:]
+class BatchOpts:
+    """
+    yt-dlp opts for one batch, built once: out_dir and exports are sticky,
+    only the cookie mode changes between attempts.
+
+    Per-format views are shared read-only between URLs / threads
+    (run_download flattens them into its own dict).
+    """
+
+    def __init__(self, out_dir: Path, exports: Sequence[str], fast_names: bool = False) -> None:
+        self.out_dir = out_dir
+        self.base_no = build_base_opts(out_dir, enable_cookies=False, fast_names=fast_names)
+        self.cookie_attempts = build_cookie_attempts(
+            build_base_opts(out_dir, enable_cookies=True, fast_names=fast_names)
+        )
+
+        self._bases: dict[str, dict] = {"none": self.base_no, **dict(self.cookie_attempts)}
+        self._views: dict[tuple[str, str], Mapping[str, Any]] = {
+            (mode, ext): view
+            for mode, base in self._bases.items()
+            for ext, view in build_opts_matrix(base, exports).items()
+        }
+        self._planning: dict[str, Mapping[str, Any]] = {}
+
+    def planning(self, mode: str) -> Mapping[str, Any]:
+        """
+        Opts for the extraction pass (flat playlists) with this cookie mode.
+        """
+        view = self._planning.get(mode)
+        if view is None:
+            view = self._planning[mode] = build_planning_opts(self._bases[mode])
+        return view
+
+    def base(self, mode: str) -> dict | None:
+        """
+        Base opts for a cookie mode name ("none", "cookiefile", "browser:<name>").
+        """
+        return self._bases.get(mode)
+
+    def for_format(self, mode: str, export_ext: str) -> Mapping[str, Any]:
+        view = self._views.get((mode, export_ext))
+        if view is None:
+            view = build_opts_for_format(self._bases[mode], export_ext)
+            self._views[(mode, export_ext)] = view
+        return view
+
+
+class CookieLock:
+    """
+    Cookie mode locked for the current batch (first source that works).
+    Shared between export threads, so access goes through a lock.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.mode: str | None = None
+        self.base: dict | None = None
+
+    def get(self) -> tuple[str | None, dict | None]:
+        with self._lock:
+            return self.mode, self.base
+
+    def lock(self, mode: str, base: dict) -> None:
+        with self._lock:
+            self.mode = mode
+            self.base = base
+
+
+class VideoLocks:
+    """
+    One lock per video (extractor, id) for the batch. The same video reached
+    through different URLs (youtu.be/X vs watch?v=X, ?si= / ?ref= variants)
+    maps to the same output file -> one worker downloads it, the next one
+    finds it on disk ("already downloaded") instead of racing on the .part file.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._locks: dict[tuple[str, str], threading.Lock] = {}
+
+    def for_info(self, info: Mapping[str, Any]) -> contextlib.AbstractContextManager:
+        vid = info.get("id")
+        if vid is None:
+            return contextlib.nullcontext()
+        key = (str(info.get("extractor_key") or info.get("extractor")), str(vid))
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+
+def _run_attempt(
+    attempt: Callable[[str, dict, TextIO | None], tuple[bool, str | None, Any]],
+    mode: str,
+    base: dict,
+    out: TextIO | None,
+) -> tuple[bool, str | None, Any]:
+    # an exception is a failed attempt for this source, not the end of the ladder
+    try:
+        return attempt(mode, base, out)
+    except Exception as e:
+        return (False, str(e), None)
+
+
+def _race_attempts(
+    attempts: Sequence[tuple[str, dict]],
+    attempt: Callable[[str, dict, TextIO | None], tuple[bool, str | None, Any]],
+    pool: Executor,
+    cookies: CookieLock,
+    tag: str = "",
+    out: TextIO | None = None,
+) -> tuple[str | None, dict | None, Any, str | None]:
+    """
+    Try every cookie source at the same time on `pool`, each one logging into
+    its own buffer. The first success wins: only its log goes to `out`, the
+    other attempts are cancelled (or left to finish in the background, their
+    logs are dropped) and the ladder returns right away.
+
+    When every source fails, their logs and the returned error follow
+    cookie_sources() order, same as the serial ladder.
+    """
+
+    def run(mode: str, base: dict) -> tuple[tuple[bool, str | None, Any], io.StringIO]:
+        log = io.StringIO()
+        return (_run_attempt(attempt, mode, base, log), log)
+
+    futures = {pool.submit(run, mode, base): i for i, (mode, base) in enumerate(attempts)}
+    failed: dict[int, tuple[str | None, str]] = {}
+    try:
+        for fut in as_completed(futures):
+            i = futures[fut]
+            (ok, err, res), log = fut.result()
+            if ok:
+                mode, base = attempts[i]
+                print(log.getvalue(), end="", file=out)
+                cookies.lock(mode, base)
+                print(f"{tag}[i] Cookies mode locked: {mode}", file=out)
+                return (mode, base, res, None)
+
+            failed[i] = (err, log.getvalue())
+            if _no_retry(err):
+                break
+    finally:
+        # no wait(): the URL doesn't block on the slowest browser extraction
+        for fut in futures:
+            fut.cancel()
+
+    last_err: str | None = None
+    for i in sorted(failed):
+        err, text = failed[i]
+        print(text, end="", file=out)
+        last_err = err
+        if _no_retry(err):
+            break
+    return (None, None, None, last_err)
+
+
+def cookie_ladder(
+    opts: BatchOpts,
+    cookies: CookieLock,
+    attempt: Callable[[str, dict, TextIO | None], tuple[bool, str | None, Any]],
+    tag: str = "",
+    out: TextIO | None = None,
+    pool: Executor | None = None,
+) -> tuple[str | None, dict | None, Any, str | None]:
+    """
+    Run `attempt(mode, base_opts, out)` without cookies, then with the locked cookie mode,
+    then with every cookie source (locking the first one that works).
+
+    pool: try the cookie sources at the same time on this executor and take
+    the first one that succeeds. Only for side-effect free attempts
+    (extraction) - downloads would race on the same output file.
+
+    `attempt` logs to the `out` it gets and returns (ok, err, result).
+    Returns (mode, base_opts, result, err); mode is None when nothing worked.
+    """
+    # 1) Try without cookies
+    base_no = opts.base_no
+    ok0, err0, res0 = attempt("none", base_no, out)
+    if ok0:
+        print(f"{tag}[i] Cookies: none", file=out)
+        return ("none", base_no, res0, None)
+
+    # fail-fast cases
+    if _abort.is_set():
+        return (None, None, None, err0)
+
+    if is_permanent_unavailable_error(err0):
+        print(f"{tag}[i] Link/content appears unavailable — skipping cookie attempts.", file=out)
+        return (None, None, None, err0)
+
+    if is_networkish_error(err0):
+        print(f"{tag}[i] Looks like a network/SSL/DNS issue — skipping cookie attempts.", file=out)
+        return (None, None, None, err0)
+
+    # 2) Reuse locked cookie mode if we have one
+    locked_mode, locked_base = cookies.get()
+    if locked_mode is not None and locked_base is not None:
+        ok1, err1, res1 = attempt(locked_mode, locked_base, out)
+        if ok1:
+            return (locked_mode, locked_base, res1, None)
+
+        if _no_retry(err1):
+            print(f"{tag}[i] Skipping further cookie attempts.", file=out)
+            return (None, None, None, err1)
+
+    # 3) Try cookie sources (and lock the first one that works)
+    attempts = opts.cookie_attempts
+
+    if pool is not None and len(attempts) > 1:
+        return _race_attempts(attempts, attempt, pool, cookies, tag, out)
+
+    last_err: str | None = err0
+
+    for mode, cookie_base in attempts:
+        ok2, err2, res2 = _run_attempt(attempt, mode, cookie_base, out)
+        if ok2:
+            cookies.lock(mode, cookie_base)
+            print(f"{tag}[i] Cookies mode locked: {mode}", file=out)
+            return (mode, cookie_base, res2, None)
+
+        last_err = err2
+
+        if _no_retry(err2):
             break
 
-    # Strip common trailing punctuation from copy/paste
-    s = s.rstrip(" \t\r\n.!,);]>'\"")
+    return (None, None, None, last_err)
+
+
+def resolve_info(
+    url: str,
+    opts: BatchOpts,
+    cookies: CookieLock,
+    extractors: ExtractorPool,
+    out: TextIO | None = None,
+) -> tuple[str | None, dict | None, dict | None, str | None]:
+    """
+    Extract the URL once (cookie ladder included).
+    Returns (mode, base_opts, info, err); fresh results come from the on-disk cache.
+    """
+    cached = load_info(url)
+    if cached is not None:
+        mode, info = cached
+        base = opts.base(mode)
+        if base is not None:
+            print(f"[i] Using cached info (cookies: {mode})", file=out)
+            return (mode, base, info, None)
+
+    def attempt(mode: str, _base: dict, log: TextIO | None) -> tuple[bool, str | None, dict | None]:
+        info, err = extractors.extract(url, mode, opts.planning(mode), out=log)
+        return (info is not None, err, info)
+
+    # extraction writes nothing -> cookie sources can be probed side by side
+    mode, base, info, err = cookie_ladder(opts, cookies, attempt, out=out, pool=extractors.attempts)
+    if mode is not None and info is not None:
+        save_info(url, mode, info)
+    return (mode, base, info, err)
+
+
+def _done_line(mode: str | None, export_ext: str) -> str:
+    if mode in (None, "none"):
+        return f"✅ Done: {export_ext}"
+    return f"✅ Done ({mode}): {export_ext}"
+
+
+def download_export(
+    url: str,
+    opts: BatchOpts,
+    export_ext: str,
+    cookies: CookieLock,
+    resolved: tuple[str, dict, dict],
+    derived: Sequence[str] = (),
+    out: TextIO | None = None,
+) -> tuple[bool, str]:
+    """
+    Download one export from the already extracted info.
+    Falls back to a full cookie ladder (fresh extraction) if that fails.
+
+    derived: other exports written from the downloaded video with ffmpeg
+    on the local file (container remux / mp3 cut) instead of downloading
+    the source again.
+
+    Returns (ok, status line(s)) - printed by the caller.
+    """
+    tag = f"[{export_ext}] "
+    mode, base, info = resolved
+
+    pps: list[Any] = []
+    if derived:
+        from .postprocessors import Mp3FromVideoPP, RemuxCopyPP
+
+        pps = [Mp3FromVideoPP() if d == "mp3" else RemuxCopyPP(d) for d in derived]
+
+    def finish(ok_video: bool, line: str, err: str | None = None) -> tuple[bool, str]:
+        ok_all = ok_video
+        lines = [line]
+        for pp in pps:
+            d = pp.target_ext
+            if ok_video and not pp.failed:
+                lines.append(f"✅ Done (from {export_ext}): {d}")
+                continue
+
+            # a separate download would hit the same dead link / network
+            why = pp.failed[-1] if ok_video else err
+            if _no_retry(why):
+                ok_all = False
+                lines.append(f"❌ Failed: {d}: {why}")
+                continue
+
+            # could not be derived -> regular download of that export
+            if ok_video:
+                print(f"{tag}[i] {d} from video failed — downloading it separately.", file=out)
+            ok_d, line_d = download_export(url, opts, d, cookies, resolved, out=out)
+            ok_all = ok_all and ok_d
+            lines.append(line_d)
+        return (ok_all, "\n".join(lines))
+
+    job_info = audio_only_info(info) if export_ext == "mp3" else info
+    ok, err = run_download(
+        url, opts.for_format(mode, export_ext), tag, info=job_info, post_processors=pps, out=out
+    )
+    if ok:
+        return finish(True, _done_line(mode, export_ext))
+
+    if _no_retry(err):
+        return finish(False, f"❌ Failed: {export_ext}: {err}", err)
+
+    print(f"{tag}[i] Download from extracted info failed — retrying with fresh extraction.", file=out)
+
+    def attempt(m: str, _base: dict, log: TextIO | None) -> tuple[bool, str | None, None]:
+        ok_try, err_try = run_download(url, opts.for_format(m, export_ext), tag, post_processors=pps, out=log)
+        return (ok_try, err_try, None)
+
+    mode2, _, _, err2 = cookie_ladder(opts, cookies, attempt, tag, out)
+    if mode2 is not None:
+        return finish(True, _done_line(mode2, export_ext))
+
+    last_err = err2 or err
+    if last_err:
+        return finish(False, f"❌ Failed: {export_ext}: {last_err}", last_err)
+    return finish(False, f"❌ Failed: {export_ext}")
+
+
+def plan_exports(exports: list[str]) -> tuple[list[str], dict[str, list[str]]]:
+    """
+    Returns (jobs, derived).
+    mp4 / mkv / mov differ only in the container, so only the first picked
+    video export is downloaded; the other containers are remuxed from it
+    and mp3 is cut from its audio track. derived maps that export to the
+    exports it produces.
+    """
+    video_exports = [e for e in exports if e in VIDEO_EXTS]
+    if not video_exports:
+        return (list(exports), {})
+
+    source = video_exports[0]
+    return ([source], {source: [e for e in exports if e != source]})
+
+
+def process_url(
+    idx: int,
+    total: int,
+    url: str,
+    opts: BatchOpts,
+    exports: list[str],
+    cookies: CookieLock,
+    extractors: ExtractorPool,
+    out: TextIO | None = None,
+    check: tuple[bool, str | None] | None = None,
+    videos: VideoLocks | None = None,
+) -> tuple[str, str | None]:
+    """
+    Full pipeline for one URL: fast check -> extraction (cookie ladder) -> exports.
+    check: precomputed quick_url_check result (precheck_urls), None = check now.
+    videos: batch-wide per-video locks (URLs run in parallel), None = no locking.
+    Returns (status, reason) with status "ok", "failed" or "invalid".
+    """
+    print(f"\n=== [{idx}/{total}] URL ===\n{url}", file=out)
+
+    ok_url, why = check if check is not None else quick_url_check(url)
+    if not ok_url:
+        print(f"❌ Invalid/unreachable URL (fast check): {why}", file=out)
+        return ("invalid", why)
+
+    # Extract once; every export is processed from the same info dict
+    mode, base, info, err = resolve_info(url, opts, cookies, extractors, out)
+    if mode is None or base is None or info is None:
+        print(f"❌ Failed: {err}" if err else "❌ Failed", file=out)
+        return ("failed", err)
+
+    resolved = (mode, base, info)
+    jobs, derived = plan_exports(exports)
+    url_failed = False
+
+    # one download per URL (plan_exports); the other exports come from its file
+    with videos.for_info(info) if videos is not None else contextlib.nullcontext():
+        for export_ext in jobs:
+            print(f"\n--- Export: {export_ext} ---", file=out)
+            ok_export, status = download_export(
+                url, opts, export_ext, cookies, resolved, derived.get(export_ext, ()), out
+            )
+            print(status, file=out)
+            if not ok_export:
+                url_failed = True
+
+    return ("failed", None) if url_failed else ("ok", None)
+
+
+def url_workers() -> int:
+    """
+    How many URLs are processed at once (RIPBOX_WORKERS, default 3).
+    """
+    try:
+        return max(1, int(os.environ.get("RIPBOX_WORKERS", "3")))
+    except ValueError:
+        return 3
+
+
+def fast_names() -> bool:
+    """
+    RIPBOX_FAST_NAMES=1: name files "<id>.<ext>" instead of "<title> [<id>].<ext>".
+    """
+    return os.environ.get("RIPBOX_FAST_NAMES", "").strip().lower() in ("1", "true", "yes", "on")
+
+
+_print_lock = threading.Lock()
 
-    return s
 
 def main() -> None:
     print("=== Universal video downloader (YouTube / X / Instagram / TikTok / Facebook) ===")
@@ -234,11 +867,12 @@ def main() -> None:
             print("[i] Reset done. Next run will ask for folder and format again.\n")
             continue
 
-        if inp.source == "file" and not inp.text:
+        # big links.txt only carries urls (text is None)
+        if inp.source == "file" and inp.text == "":
             print("❌ links.txt not found in project root.")
             continue
 
-        if not inp.text:
+        if inp.text == "":
             print("Done. Bye!")
             return
 
@@ -250,6 +884,12 @@ def main() -> None:
         total = len(urls)
         print(f"[i] Found {total} URL(s).")
 
+        # fast checks for the whole batch (DNS + probe, in parallel) run in the
+        # background while the folder / format prompts wait for the user
+        prechecker = ThreadPoolExecutor(max_workers=1)
+        checks_future = prechecker.submit(precheck_urls, urls)
+        prechecker.shutdown(wait=False)  # thread exits once the checks are done
+
         # ---------------------------------------------------------
         # Output dir (sticky)
         # ---------------------------------------------------------
@@ -277,102 +917,70 @@ def main() -> None:
             print(f"[i] Using previous export(s): {', '.join(last_exports)}")
 
         exports = last_exports
+        checks = checks_future.result()
 
         # ---------------------------------------------------------
         # Batch state (cookies lock stays per batch-run)
         # ---------------------------------------------------------
-        chosen_cookie_mode: str | None = None
-        chosen_cookie_base: dict | None = None
+        opts = BatchOpts(out_dir, exports, fast_names())
+        cookies = CookieLock()
+        videos = VideoLocks()
+        workers = min(url_workers(), total)
+        extractors = ExtractorPool(attempt_workers=workers * len(opts.cookie_attempts))
 
         ok_urls: list[str] = []
         fail_urls: list[str] = []
         invalid_urls: list[tuple[str, str]] = []  # (url, reason)
 
+        def run_one(idx: int, url: str) -> tuple[str, str | None]:
+            # with several URLs in flight, each one logs into its own buffer
+            # which is flushed in one piece -> output stays readable
+            buf = io.StringIO() if workers > 1 else None
+            try:
+                return process_url(
+                    idx, total, url, opts, exports, cookies, extractors, buf, checks.get(url), videos
+                )
+            finally:
+                if buf is not None:
+                    with _print_lock:
+                        sys.stdout.write(buf.getvalue())
+                        sys.stdout.flush()
+
         # ---------------------------------------------------------
-        # Bulk loop
+        # Bulk loop (URLs in parallel)
         # ---------------------------------------------------------
+        results: dict[int, tuple[str, str | None]] = {}
+        _abort.clear()
+        try:
+            if workers == 1:
+                # serial on the main thread: Ctrl+C stops the running download at once
+                for idx, url in enumerate(urls, start=1):
+                    results[idx] = run_one(idx, url)
+            else:
+                pool = ThreadPoolExecutor(max_workers=workers)
+                try:
+                    url_futures = {
+                        pool.submit(run_one, idx, url): idx
+                        for idx, url in enumerate(urls, start=1)
+                    }
+                    for fut in as_completed(url_futures):
+                        results[url_futures[fut]] = fut.result()
+                except BaseException:
+                    # Ctrl+C (or a crash): drop queued URLs, running ones stop via _abort_hook
+                    _abort.set()
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    raise
+                pool.shutdown()
+        finally:
+            # pooled YoutubeDL instances + cookie jars, also when a URL raised
+            extractors.close(wait=not _abort.is_set())
+
+        # summary keeps input order
         for idx, url in enumerate(urls, start=1):
-            print(f"\n=== [{idx}/{total}] URL ===\n{url}")
-
-            ok_url, why = quick_url_check(url)
-            if not ok_url:
-                print(f"❌ Invalid/unreachable URL (fast check): {why}")
-                invalid_urls.append((url, why))
-                continue
-
-            url_failed = False
-
-            for export_ext in exports:
-                print(f"\n--- Export: {export_ext} ---")
-
-                # 1) Try without cookies
-                base_no = build_base_opts(out_dir, enable_cookies=False)
-                ydl_no = build_opts_for_format(base_no, export_ext)
-
-                ok0, err0 = run_download(url, ydl_no)
-                if ok0:
-                    print("[i] Cookies: none")
-                    print(f"✅ Done: {export_ext}")
-                    continue
-
-                # fail-fast cases
-                if is_permanent_unavailable_error(err0):
-                    url_failed = True
-                    print(f"❌ Failed: {export_ext}: {err0}")
-                    print("[i] Link/content appears unavailable — skipping cookie attempts.")
-                    continue
-
-                if is_networkish_error(err0):
-                    url_failed = True
-                    print(f"❌ Failed: {export_ext}: {err0}")
-                    print("[i] Looks like a network/SSL/DNS issue — skipping cookie attempts.")
-                    continue
-
-                # 2) Reuse locked cookie mode if we have one
-                if chosen_cookie_base is not None:
-                    ydl_locked = build_opts_for_format(chosen_cookie_base, export_ext)
-                    ok1, err1 = run_download(url, ydl_locked)
-                    if ok1:
-                        print(f"✅ Done ({chosen_cookie_mode}): {export_ext}")
-                        continue
-
-                    if is_permanent_unavailable_error(err1) or is_networkish_error(err1):
-                        url_failed = True
-                        print(f"❌ Failed: {export_ext}: {err1}")
-                        print("[i] Skipping further cookie attempts.")
-                        continue
-
-                # 3) Try cookie sources (and lock the first one that works)
-                base_yes = build_base_opts(out_dir, enable_cookies=True)
-                attempts = build_cookie_attempts(base_yes)
-
-                success = False
-                last_err: str | None = err0
-
-                for mode, cookie_base in attempts:
-                    ydl_try = build_opts_for_format(cookie_base, export_ext)
-                    ok2, err2 = run_download(url, ydl_try)
-                    if ok2:
-                        chosen_cookie_mode = mode
-                        chosen_cookie_base = cookie_base
-                        print(f"[i] Cookies mode locked: {mode}")
-                        print(f"✅ Done ({mode}): {export_ext}")
-                        success = True
-                        break
-
-                    last_err = err2
-
-                    if is_permanent_unavailable_error(err2) or is_networkish_error(err2):
-                        break
-
-                if not success:
-                    url_failed = True
-                    if last_err:
-                        print(f"❌ Failed: {export_ext}: {last_err}")
-                    else:
-                        print(f"❌ Failed: {export_ext}")
-
-            if url_failed:
+            status, reason = results[idx]
+            if status == "invalid":
+                invalid_urls.append((url, reason or ""))
+            elif status == "failed":
                 fail_urls.append(url)
             else:
                 ok_urls.append(url)
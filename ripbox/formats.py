@@ -1,4 +1,4 @@
-from typing import List
+from typing import Dict, List
 
 # ------------------------------------------------------------
 # Export format menu
@@ -15,6 +15,28 @@ FORMAT_MENU = {
     4: ("mp3", "Audio MP3 (audio-only)"),
 }
 
+# Extensions that are video containers (everything else is audio-only)
+VIDEO_EXTS = ("mp4", "mkv", "mov")
+
+# ------------------------------------------------------------
+# Precomputed at import (the menu never changes at runtime)
+# ------------------------------------------------------------
+# Separators accepted between numbers -> all mapped to a space,
+# so one str.translate() + split() tokenizes the input.
+_SEP_TABLE = str.maketrans(",;|\t", "    ")
+
+# Menu entries sorted by key so order is predictable (1, 2, 3, 4)
+_MENU_ITEMS = sorted(FORMAT_MENU.items())
+
+# Reverse lookup used while parsing: number -> extension
+_EXT_BY_KEY = {k: ext for k, (ext, _desc) in _MENU_ITEMS}
+
+# Menu text. MP4 is marked as the default choice in the UI.
+_MENU_STR = "\n".join(
+    f"  {k}) {desc}" + (" (default)" if k == 1 else "")
+    for k, (_ext, desc) in _MENU_ITEMS
+)
+
 
 def choose_formats(ask) -> List[str]:
     """
@@ -23,7 +45,7 @@ def choose_formats(ask) -> List[str]:
     Behavior:
     - Displays a numbered list of available formats
     - Accepts multiple selections in one line (e.g. "1 4")
-    - Accepts commas or spaces as separators
+    - Accepts commas, semicolons, pipes, tabs or spaces as separators
     - Pressing Enter with no input selects the default format (MP4)
     - Invalid input is ignored safely
     - Duplicate selections are removed
@@ -42,15 +64,7 @@ def choose_formats(ask) -> List[str]:
     # Print available formats to the user
     # --------------------------------------------------------
     print("\nExport formats:")
-
-    # Sort keys so menu order is predictable (1, 2, 3, 4)
-    for k in sorted(FORMAT_MENU.keys()):
-        ext, desc = FORMAT_MENU[k]
-
-        # Mark MP4 as the default choice in the UI
-        default_tag = " (default)" if k == 1 else ""
-
-        print(f"  {k}) {desc}{default_tag}")
+    print(_MENU_STR)
 
     # --------------------------------------------------------
     # Read user input
@@ -66,28 +80,23 @@ def choose_formats(ask) -> List[str]:
     # --------------------------------------------------------
     # Parse user input
     # --------------------------------------------------------
-    picked: List[str] = []
-
-    # Replace commas with spaces so both "1,4" and "1 4" work
-    for token in raw.replace(",", " ").split():
-        try:
-            # Convert token to integer menu key
-            n = int(token)
-        except ValueError:
-            # Ignore anything that is not a number
-            continue
+    # dict keeps insertion order -> ordered dedup without list scans
+    picked: Dict[str, None] = {}
 
-        # Check if the number exists in FORMAT_MENU
-        if n in FORMAT_MENU:
-            ext = FORMAT_MENU[n][0]
+    for token in raw.translate(_SEP_TABLE).split():
+        # Ignore anything that is not a plain number
+        # (isdecimal() accepts exactly what int() parses, no exception path)
+        if not token.isdecimal():
+            continue
 
-            # Avoid duplicates while preserving order
-            if ext not in picked:
-                picked.append(ext)
+        # Numbers that are not in FORMAT_MENU are ignored too
+        ext = _EXT_BY_KEY.get(int(token))
+        if ext:
+            picked[ext] = None
 
     # --------------------------------------------------------
     # Final safety fallback
     # --------------------------------------------------------
     # If user entered only invalid input, fall back to default MP4
     #
-    return picked if picked else ["mp4"]
+    return list(picked) or ["mp4"]
@@ -0,0 +1,107 @@
+# ripbox/info_cache.py
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any
+import contextlib
+import hashlib
+import json
+import os
+import time
+
+
+# Extracted info dicts carry signed media URLs -> keep them short-lived.
+INFO_TTL_S = 10 * 60
+
+
+def cache_root() -> Path:
+    """
+    Per-user cache directory ($XDG_CACHE_HOME/ripbox, default ~/.cache/ripbox).
+    """
+    xdg = os.environ.get("XDG_CACHE_HOME", "").strip()
+    base = Path(xdg) if xdg else Path.home() / ".cache"
+    return base / "ripbox"
+
+
+def cache_enabled() -> bool:
+    """
+    RIPBOX_INFO_CACHE=0 turns the info cache off (nothing read or written).
+    """
+    return os.environ.get("RIPBOX_INFO_CACHE", "").strip().lower() not in ("0", "false", "no", "off")
+
+
+def _entry_path(url: str) -> Path:
+    key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+    return cache_root() / "info" / f"{key}.json"
+
+
+def load_info(url: str) -> tuple[str, dict] | None:
+    """
+    Return (cookie mode, info dict) if a fresh entry exists for this URL.
+    Anything unreadable / expired is treated as a miss.
+    """
+    if not cache_enabled():
+        return None
+
+    path = _entry_path(url)
+    try:
+        if time.time() - path.stat().st_mtime > INFO_TTL_S:
+            return None
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+    mode = data.get("mode")
+    info = data.get("info")
+    if data.get("url") != url or not isinstance(mode, str) or not isinstance(info, dict):
+        return None
+    return (mode, info)
+
+
+def _strip_cookies(obj: Any) -> Any:
+    """
+    Copy of `obj` without session cookies: "cookies" keys (per format) and
+    Cookie headers in "http_headers". yt-dlp fills them again from the
+    cookie jar when the cached info is processed.
+    """
+    if isinstance(obj, list):
+        return [_strip_cookies(v) for v in obj]
+    if not isinstance(obj, dict):
+        return obj
+
+    clean: dict = {}
+    for k, v in obj.items():
+        if k == "cookies":
+            continue
+        if k == "http_headers" and isinstance(v, dict):
+            clean[k] = {h: hv for h, hv in v.items() if str(h).lower() != "cookie"}
+            continue
+        clean[k] = _strip_cookies(v)
+    return clean
+
+
+def save_info(url: str, mode: str, info: dict) -> None:
+    """
+    Store a sanitized (JSON-safe) info dict, cookies stripped, readable by the
+    owner only. Cache is best-effort: errors are ignored.
+    """
+    if not cache_enabled():
+        return
+
+    path = _entry_path(url)
+    tmp = path.with_suffix(".tmp")
+    try:
+        path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        data = json.dumps({"url": url, "mode": mode, "info": _strip_cookies(info)})
+        # fresh file each time -> O_EXCL guarantees the 0600 mode is applied
+        with contextlib.suppress(FileNotFoundError):
+            tmp.unlink()
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with open(fd, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except (OSError, TypeError, ValueError):
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
@@ -3,93 +3,119 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Iterable, Iterator
+import itertools
+import mmap
 import re
-
-
-# Regex: pokupi http/https linkove do prvog whitespace-a ili navodnika
-_URL_RE = re.compile(r"https?://[^\s<>\"]+")
-
-
-def normalize_url(raw: str) -> str:
-    """
-    Make pasted URLs robust:
-    - trim whitespace
-    - salvage if junk exists before http(s)
-    - strip trailing punctuation from copy/paste (.,); etc)
-    - if multiple URLs are stuck together, keep only the first one
-    """
-    s = (raw or "").strip()
-
-    # salvage first http(s) if there's junk before it
-    first_https = s.find("https://")
-    first_http = s.find("http://")
-    firsts = [i for i in (first_https, first_http) if i != -1]
-    if firsts:
-        s = s[min(firsts):]
-
-    # cut at second url if pasted without whitespace
-    second_https = s.find("https://", 1)
-    second_http = s.find("http://", 1)
-    seconds = [i for i in (second_https, second_http) if i != -1]
-    if seconds:
-        s = s[: min(seconds)]
-
-    # strip common trailing punctuation
-    s = s.rstrip(" \t\r\n.!,);]>'\"")
-
-    return s
-
-
-def extract_urls(text: str) -> list[str]:
+import sys
+
+
+# Regex: pokupi http/https linkove do prvog whitespace-a ili navodnika.
+# Staje prije zalijepljenog drugog http(s):// (samo "h" gleda unaprijed);
+# zavrsna interpunkcija (.,);] ...) se skida s rstrip(_TRAIL_PUNCT).
+#
+# Comment-only lines (# ...) are the first alternative: the line break in
+# front of such a line + the line itself are consumed with an empty group,
+# so its URLs are skipped in the same findall pass (no comment-stripping
+# copy of the text). Line breaks are the str.splitlines() ones, not just \n.
+# A comment on the very first line has no break in front -> _LEAD_COMMENT_RE.
+_BREAKS = "\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029"
+
+_URL_OR_COMMENT_RE = re.compile(
+    rf"[{_BREAKS}][^\S{_BREAKS}]*+#[^{_BREAKS}]*+"
+    r"|(https?://(?>[^\s<>\"h]++|h(?!ttps?://))++)"
+)
+_LEAD_COMMENT_RE = re.compile(rf"[^\S{_BREAKS}]*+#[^{_BREAKS}]*+")
+
+# Isto za bytes (mmap-ani links.txt), prijelomi i razmaci kao UTF-8 sekvence.
+# URL ide do ASCII razmaka, bez provjere svakog bajta - samo "h" i vodeci
+# bajtovi \xc2 / \xe2 (NEL, U+2028/9 su prijelomi reda) gledaju unaprijed.
+# Matchevi s ne-ASCII znakovima se dekodiraju i prolaze str pattern
+# (Unicode razmaci kao NBSP / U+3000).
+_BREAK_B = rb"[\n\r\x0b\x0c\x1c-\x1e]|\xc2\x85|\xe2\x80[\xa8\xa9]"
+_SPACE_B = rb"[ \t\x1f]|\xc2\xa0|\xe1\x9a\x80|\xe2\x80[\x80-\x8a\xaf]|\xe2\x81\x9f|\xe3\x80\x80"
+_LINE_REST_B = rb"(?>[^\n\r\x0b\x0c\x1c-\x1e\xc2\xe2]++|\xc2(?!\x85)|\xe2(?!\x80[\xa8\xa9]))*+"
+
+_URL_OR_COMMENT_RE_B = re.compile(
+    rb"(?:" + _BREAK_B + rb")(?:" + _SPACE_B + rb")*+#" + _LINE_REST_B
+    + rb"|(https?://(?>[^\s\x1c-\x1f<>\"h\xc2\xe2]++|h(?!ttps?://)|\xc2(?!\x85)|\xe2(?!\x80[\xa8\xa9]))++)"
+)
+_LEAD_COMMENT_RE_B = re.compile(rb"(?:" + _SPACE_B + rb")*+#" + _LINE_REST_B)
+
+# trailing copy/paste junk
+_TRAIL_PUNCT = " \t\r\n.!,);]>'\""
+
+# links.txt bigger than this is scanned through mmap (no decoded copy)
+_MMAP_MIN_BYTES = 1 << 20
+
+
+def extract_urls(text: str | bytes | mmap.mmap) -> list[str]:
     """
     Extract all http(s) URLs from arbitrary text (multi-line, prose, comments, etc).
     - ignores comment-only lines (starting with #)
     - strips trailing punctuation
     - dedups while preserving order
+
+    Bytes / mmap input is scanned as-is; only the matches are decoded.
     """
     if not text:
         return []
 
-    lines = text.splitlines()
-    filtered = []
-    for ln in lines:
-        if ln.lstrip().startswith("#"):
-            continue
-        filtered.append(ln)
-
-    blob = "\n".join(filtered)
+    if isinstance(text, str):
+        lead = _LEAD_COMMENT_RE.match(text)
+        found = _URL_OR_COMMENT_RE.findall(text, lead.end() if lead else 0)
+    else:
+        lead = _LEAD_COMMENT_RE_B.match(text)
+        found = _decode_matches(_URL_OR_COMMENT_RE_B.findall(text, lead.end() if lead else 0))
 
-    found = _URL_RE.findall(blob)
-    out: list[str] = []
-    seen: set[str] = set()
+    # one streaming pass (rstrip mapped in C): dict keeps first-seen order -> ordered dedup
+    return list(dict.fromkeys(u for u in map(str.rstrip, found, itertools.repeat(_TRAIL_PUNCT)) if u))
 
-    for u in found:
-        nu = normalize_url(u)
-        if not nu:
-            continue
-        if nu in seen:
-            continue
-        seen.add(nu)
-        out.append(nu)
 
-    return out
+def _decode_matches(found: Iterable[bytes]) -> Iterator[str]:
+    """
+    str URLs from bytes matches. ASCII (the usual case) is decoded as-is;
+    the rest goes through the str pattern (Unicode spaces end a URL there).
+    """
+    for m in found:
+        if m.isascii():
+            yield m.decode("ascii")
+        elif m:
+            yield from _URL_OR_COMMENT_RE.findall(m.decode("utf-8", "ignore"))
 
 
-def read_text_from_prompt() -> str:
+def _read_paste_lines(lines: list[str]) -> list[str]:
     """
-    Multi-line paste mode. Empty line starts processing.
+    Append input() lines until an empty / whitespace-only line (or EOF / Ctrl+C).
+    Lines are kept as-is; callers strip the joined text once.
+
+    Piped stdin (not a TTY) is taken in one chunk: sys.stdin is iterated up to
+    the blank line in C (no input() call per line). The blank line still ends
+    the paste -> folder / format answers that follow stay on stdin.
     """
-    print("→ Paste text / URLs (empty line to start):")
-    lines: list[str] = []
+    if not sys.stdin.isatty():
+        chunk = "".join(itertools.takewhile(str.strip, sys.stdin))
+        if chunk:
+            lines.append(chunk)
+        return lines
+
     while True:
         try:
             line = input()
         except (EOFError, KeyboardInterrupt):
-            line = ""
-        if not line.strip():
+            break
+        if not line or line.isspace():
             break
         lines.append(line)
-    return "\n".join(lines).strip()
+    return lines
+
+
+def read_text_from_prompt() -> str:
+    """
+    Multi-line paste mode. Empty line starts processing.
+    """
+    print("→ Paste text / URLs (empty line to start):")
+    return "\n".join(_read_paste_lines([])).strip()
 
 
 def read_text_from_file(path: Path) -> str:
@@ -99,10 +125,24 @@ def read_text_from_file(path: Path) -> str:
     return path.read_text(encoding="utf-8", errors="ignore").strip()
 
 
+def read_urls_from_file(path: Path) -> tuple[str | None, list[str]]:
+    """
+    (text, urls) from a links file.
+    Big files (> 1 MiB) are mmap'd and scanned as bytes -> no full decode;
+    text is None then (only the URLs are kept), "" still means an empty file.
+    """
+    if path.stat().st_size <= _MMAP_MIN_BYTES:
+        text = read_text_from_file(path)
+        return (text, extract_urls(text))
+
+    with path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return (None, extract_urls(mm))
+
+
 @dataclass(frozen=True)
 class InputResult:
     source: str           # "paste" or "file"
-    text: str
+    text: str | None      # None = big links.txt, only urls kept
     urls: list[str]
     reset: bool = False
 
@@ -124,22 +164,11 @@ def choose_input(ask) -> InputResult:
         links_path = project_root / "links.txt"
         if not links_path.exists():
             return InputResult("file", "", [])
-        text = read_text_from_file(links_path)
-        urls = extract_urls(text)
+        text, urls = read_urls_from_file(links_path)
         return InputResult("file", text, urls)
 
     # otherwise paste mode (multi-line)
-    lines = [first]
-    while True:
-        try:
-            line = input()
-        except (EOFError, KeyboardInterrupt):
-            break
-        if not line.strip():
-            break
-        lines.append(line)
-
-    text = "\n".join(lines).strip()
+    text = "\n".join(_read_paste_lines([first])).strip()
     urls = extract_urls(text)
     return InputResult("paste", text, urls)
 
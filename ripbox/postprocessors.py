@@ -0,0 +1,62 @@
+# ripbox/postprocessors.py
+from __future__ import annotations
+
+from typing import Sequence
+import os
+
+from yt_dlp.postprocessor import FFmpegPostProcessor
+from yt_dlp.utils import PostProcessingError, prepend_extension, replace_extension
+
+
+class _DerivedExportPP(FFmpegPostProcessor):
+    """
+    Write "<name>.<target_ext>" next to the final (merged) video with one
+    ffmpeg pass on the local file -> no second download / extraction.
+
+    Errors never fail the video export; they are collected in `failed`
+    so the caller can fall back to a regular download of that export.
+    """
+
+    def __init__(self, target_ext: str, ffmpeg_opts: Sequence[str], downloader=None) -> None:
+        super().__init__(downloader)
+        self.target_ext = target_ext
+        self.ffmpeg_opts = list(ffmpeg_opts)
+        self.failed: list[str] = []
+
+    def run(self, info: dict) -> tuple[list[str], dict]:
+        src = info["filepath"]
+        dst = replace_extension(src, self.target_ext, info.get("ext"))
+        tmp = prepend_extension(dst, "temp")
+
+        self.to_screen(f'Writing {self.target_ext} from video; Destination: {dst}')
+        try:
+            self.run_ffmpeg(src, tmp, self.ffmpeg_opts)
+            os.replace(tmp, dst)
+        except (PostProcessingError, OSError) as e:
+            self.failed.append(str(e))
+            self.report_warning(f"{self.target_ext} from video failed: {e}")
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+        # keep the video: it is an export in its own right
+        return [], info
+
+
+class Mp3FromVideoPP(_DerivedExportPP):
+    """
+    mp3 from the video's first audio track (same quality as FFmpegExtractAudio "0").
+    """
+
+    def __init__(self, downloader=None) -> None:
+        super().__init__("mp3", ["-vn", "-map", "0:a:0", "-c:a", "libmp3lame", "-q:a", "0"], downloader)
+
+
+class RemuxCopyPP(_DerivedExportPP):
+    """
+    Another container (mkv / mov / mp4) with the same streams: remux, no re-encode.
+    """
+
+    def __init__(self, target_ext: str, downloader=None) -> None:
+        super().__init__(target_ext, FFmpegPostProcessor.stream_copy_opts(ext=target_ext), downloader)
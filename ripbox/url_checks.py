@@ -1,20 +1,47 @@
 # ripbox/url_checks.py
 from __future__ import annotations
 
-from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import ParseResult, urlparse
+import atexit
+import functools
+import http.client
+import re
 import socket
 import ssl
+import threading
 import urllib.request
 
 
+_YT_HOSTS = frozenset({"youtube.com", "www.youtube.com", "m.youtube.com", "youtu.be"})
+
+# Supported sites: they either work or yt-dlp reports a better error than
+# a bare probe would -> DNS check only, no HTTP round trip.
+_KNOWN_GOOD_HOSTS = _YT_HOSTS | frozenset({
+    "x.com",
+    "www.x.com",
+    "twitter.com",
+    "mobile.twitter.com",
+    "instagram.com",
+    "www.instagram.com",
+    "tiktok.com",
+    "www.tiktok.com",
+    "vm.tiktok.com",
+    "facebook.com",
+    "www.facebook.com",
+    "m.facebook.com",
+    "fb.watch",
+})
+
+
+@functools.lru_cache(maxsize=512)
 def _maybe_youtube_typo(host: str) -> str | None:
     """
     Cheap typo hints for common YouTube mistakes.
     """
     h = (host or "").lower()
 
-    real = {"youtube.com", "www.youtube.com", "m.youtube.com", "youtu.be"}
-    if h in real:
+    if h in _YT_HOSTS:
         return None
 
     if "yout" in h and "youtube" not in h:
@@ -23,6 +50,115 @@ def _maybe_youtube_typo(host: str) -> str | None:
     return None
 
 
+# HEAD not allowed / not implemented -> fall back to a 1-byte Range GET
+_HEAD_REFUSED = frozenset({405, 501})
+
+# Bodies up to this size are read to keep the connection alive
+_DRAIN_MAX = 64 * 1024
+
+# Keep-alive connections per (scheme, host, port): a same-host batch pays
+# connect + TLS once. Idle connections are parked here; a probe takes one
+# out while it uses it -> no connection is shared between threads.
+_ConnKey = tuple[str, str, int]
+_idle_conns: dict[_ConnKey, list[http.client.HTTPConnection]] = {}
+_conns_lock = threading.Lock()
+
+
+def _take_conn(key: _ConnKey, timeout_s: float, reuse: bool = True) -> tuple[http.client.HTTPConnection, bool]:
+    """
+    (connection, reused): an idle one for this host if there is one, else a new one.
+    """
+    if reuse:
+        with _conns_lock:
+            idle = _idle_conns.get(key)
+            if idle:
+                conn = idle.pop()
+                conn.timeout = timeout_s
+                return (conn, True)
+
+    scheme, host, port = key
+    if scheme == "https":
+        conn = http.client.HTTPSConnection(host, port, timeout=timeout_s, context=ssl.create_default_context())
+    else:
+        conn = http.client.HTTPConnection(host, port, timeout=timeout_s)
+    return (conn, False)
+
+
+def _park_conn(key: _ConnKey, conn: http.client.HTTPConnection) -> None:
+    with _conns_lock:
+        _idle_conns.setdefault(key, []).append(conn)
+
+
+@atexit.register
+def _close_conns() -> None:
+    with _conns_lock:
+        conns = [c for idle in _idle_conns.values() for c in idle]
+        _idle_conns.clear()
+    for conn in conns:
+        conn.close()
+
+
+def _probe(p: ParseResult, method: str, timeout_s: float) -> int:
+    """
+    HEAD (no body at all) or 1-byte Range GET; returns the HTTP status.
+    Redirects are not followed (3xx already means "reachable").
+    """
+    key = (p.scheme, p.hostname or "", p.port or (443 if p.scheme == "https" else 80))
+    target = p.path or "/"
+    if p.query:
+        target = f"{target}?{p.query}"
+
+    headers = {"User-Agent": "Mozilla/5.0"}
+    if method == "GET":
+        headers["Range"] = "bytes=0-0"
+
+    conn, reused = _take_conn(key, timeout_s)
+    while True:
+        try:
+            conn.request(method, target, headers=headers)
+            resp = conn.getresponse()
+            break
+        except Exception:
+            # broken / timed out connection is not reused
+            conn.close()
+            if not reused:
+                raise
+            # server dropped the idle keep-alive connection -> once more on a fresh one
+            conn, reused = _take_conn(key, timeout_s, reuse=False)
+
+    # Only reuse the connection when draining is cheap: HEAD / 206 / a small body.
+    # A server that ignores Range would otherwise stream the whole file here.
+    length = resp.getheader("Content-Length") or ""
+    cheap = method == "HEAD" or resp.status == 206 or (length.isdigit() and int(length) <= _DRAIN_MAX)
+    if cheap and not resp.will_close:
+        resp.read()  # drain -> connection can carry the next request
+        _park_conn(key, conn)
+    else:
+        conn.close()
+    return resp.status
+
+
+@functools.lru_cache(maxsize=1)
+def _proxies() -> dict[str, str]:
+    """
+    HTTP(S)_PROXY & co. (env / system settings), read once per process.
+    """
+    return urllib.request.getproxies()
+
+
+def _behind_proxy(scheme: str, host: str) -> bool:
+    return scheme in _proxies() and not urllib.request.proxy_bypass(host)
+
+
+@functools.lru_cache(maxsize=256)
+def _resolve(host: str, port: int) -> None:
+    """
+    DNS lookup, once per (host, port) per process.
+    Raises socket.gaierror -> failures are not cached (next batch retries).
+    """
+    socket.getaddrinfo(host, port)
+
+
 def quick_url_check(url: str, timeout_s: float = 3.0) -> tuple[bool, str | None]:
     """
     Fast sanity + reachability checks to avoid spinning yt-dlp/cookies for garbage URLs.
@@ -49,53 +185,86 @@ def quick_url_check(url: str, timeout_s: float = 3.0) -> tuple[bool, str | None]
 
     # DNS check (fast)
     try:
-        socket.getaddrinfo(host, 443 if p.scheme == "https" else 80)
+        _resolve(host, 443 if p.scheme == "https" else 80)
     except socket.gaierror:
         return (False, f"Host does not resolve (DNS): '{host}'")
 
-    # Small probe (Range GET) - if it fails, we still usually let yt-dlp try.
+    if host.lower() in _KNOWN_GOOD_HOSTS:
+        return (True, None)
+
+    # The probe talks to the host directly -> behind a proxy it would only
+    # wait out the timeout. yt-dlp honours the proxy, let it decide.
+    if _behind_proxy(p.scheme, host):
+        return (True, None)
+
+    # Small probe (HEAD, Range GET if HEAD is refused) - if it fails,
+    # we still usually let yt-dlp try.
     try:
-        req = urllib.request.Request(
-            url,
-            method="GET",
-            headers={
-                "User-Agent": "Mozilla/5.0",
-                "Range": "bytes=0-0",
-            },
-        )
-        with urllib.request.urlopen(req, timeout=timeout_s) as resp:
-            code = getattr(resp, "status", None) or 200
-            if 200 <= code < 400:
-                return (True, None)
-            return (False, f"URL responded with HTTP {code}")
-    except ssl.SSLError as e:
-        return (False, f"SSL error: {e}")
+        code = _probe(p, "HEAD", timeout_s)
+        if code in _HEAD_REFUSED:
+            _probe(p, "GET", timeout_s)
+        # any HTTP answer means reachable; 4xx/5xx are often just refused
+        # bare probes -> let yt-dlp decide
+        return (True, None)
     except Exception:
         # Some platforms block this probe; don't false-negative.
+        # TLS failures too: our trust store is not yt-dlp's (certifi / curl_cffi),
+        # self-signed / corporate CAs often still work there.
         return (True, None)
 
 
+def precheck_urls(urls: list[str], timeout_s: float = 3.0) -> dict[str, tuple[bool, str | None]]:
+    """
+    quick_url_check for a whole batch at once (I/O-bound -> threads).
+    Batch waits ~one timeout instead of one timeout per URL.
+    """
+    unique = list(dict.fromkeys(urls))
+    if not unique:
+        return {}
+
+    with ThreadPoolExecutor(max_workers=min(16, len(unique))) as pool:
+        results = pool.map(lambda u: quick_url_check(u, timeout_s), unique)
+        return dict(zip(unique, results))
+
+
+# Error-text needles, one case-insensitive regex per predicate
+# (single scan of the error string instead of one `in` per needle).
+_NET_NEEDLES = (
+    "timed out",
+    "handshake",
+    "name or service not known",
+    "temporary failure in name resolution",
+    "nodename nor servname provided",
+    "connection refused",
+    "connection reset",
+    "ssl",
+    "certificate verify failed",
+    "transporterror",
+)
+_NET_RE = re.compile("|".join(map(re.escape, _NET_NEEDLES)), re.I)
+
+_PERM_NEEDLES = (
+    "video unavailable",
+    "this video is unavailable",
+    "private video",
+    "has been removed",
+    "video has been removed",
+    "does not exist",
+    "content is not available",
+    "content unavailable",
+    "http error 404",
+    "unsupported url",
+    "url is invalid",
+)
+_PERM_RE = re.compile("|".join(map(re.escape, _PERM_NEEDLES)), re.I)
+
+
 def is_networkish_error(err: str | None) -> bool:
     """
     Timeout / DNS / SSL handshake / connect-type failures.
     Cookies won't help -> don't spin cookie sources.
     """
-    if not err:
-        return False
-    s = err.lower()
-    needles = [
-        "timed out",
-        "handshake",
-        "name or service not known",
-        "temporary failure in name resolution",
-        "nodename nor servname provided",
-        "connection refused",
-        "connection reset",
-        "ssl",
-        "certificate verify failed",
-        "transporterror",
-    ]
-    return any(n in s for n in needles)
+    return bool(err) and _NET_RE.search(err) is not None
 
 
 def is_permanent_unavailable_error(err: str | None) -> bool:
@@ -103,20 +272,4 @@ def is_permanent_unavailable_error(err: str | None) -> bool:
     Dead link / removed / private / unavailable.
     Cookies typically won't help -> fail fast.
     """
-    if not err:
-        return False
-    s = err.lower()
-    needles = [
-        "video unavailable",
-        "this video is unavailable",
-        "private video",
-        "has been removed",
-        "video has been removed",
-        "does not exist",
-        "content is not available",
-        "content unavailable",
-        "http error 404",
-        "unsupported url",
-        "url is invalid",
-    ]
-    return any(n in s for n in needles)
+    return bool(err) and _PERM_RE.search(err) is not None
@@ -1,7 +1,159 @@
+from collections import ChainMap
 from pathlib import Path
-import shutil
+from types import MappingProxyType
+from typing import Any, Mapping, Sequence
+import functools
 import os
 
+from .formats import VIDEO_EXTS
+from .info_cache import cache_root
+
+# The one place yt-dlp options are built; everything else imports these.
+__all__ = [
+    "build_base_opts",
+    "build_opts_for_format",
+    "build_opts_matrix",
+    "build_planning_opts",
+    "cookie_sources",
+]
+
+
+def _env_int(name: str, default: int, minimum: int = 1) -> int:
+    """
+    Integer tuning knob from the environment; unset / invalid -> default.
+    """
+    try:
+        return max(minimum, int(os.environ.get(name, "").strip()))
+    except ValueError:
+        return default
+
+
+_SIZE_SUFFIX = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+
+
+def _env_size(name: str) -> int | None:
+    """
+    Byte size from the environment ("10485760", "10M", "512K"); unset / invalid -> None.
+    """
+    raw = os.environ.get(name, "").strip().upper().removesuffix("B")
+    mult = _SIZE_SUFFIX.get(raw[-1:], 1)
+    if mult > 1:
+        raw = raw[:-1]
+    try:
+        size = int(raw) * mult
+    except ValueError:
+        return None
+    return size if size > 0 else None
+
+
+# aria2c: 16 connections per file (parallel range requests)
+_ARIA2C_ARGS = ("-x", "16", "-s", "16", "-k", "1M", "--file-allocation=none", "--summary-interval=0")
+
+# Netscape cookies file next to this module (optional)
+_COOKIE_PATH = Path(__file__).with_name("cookies.txt")
+
+# YouTube clients tried by the extractor (order matters)
+_PLAYER_CLIENTS = ("tv", "mweb", "tv_embedded")
+
+# Shared read-only: yt-dlp builds its own header dict from this
+_HTTP_HEADERS = MappingProxyType({"User-Agent": "Mozilla/5.0"})
+
+# Everything that does not depend on out_dir / environment / cookies.
+# Copied per template build, never handed out as-is.
+_BASE_TEMPLATE: dict[str, Any] = {
+    "format": "bv*+ba/b",
+    "merge_output_format": "mp4",
+    "ignoreerrors": True,
+    "continuedl": True,
+    # playlist entries are processed as they are extracted, not after all of them
+    "lazy_playlist": True,
+    "nopart": False,
+    "noprogress": False,
+    "http_headers": _HTTP_HEADERS,
+    "remote_components": ("ejs:github",),
+}
+
+
+@functools.lru_cache(maxsize=1)
+def _impersonate_target():
+    """
+    Chrome TLS/HTTP2 fingerprint, or None when no request handler of this
+    yt-dlp can impersonate Chrome (curl_cffi missing / unsupported version)
+    -> plain urllib handler as before. Same check the YoutubeDL constructor
+    runs (it raises on an unavailable target), done once per process.
+    """
+    try:
+        from yt_dlp import YoutubeDL
+        from yt_dlp.networking.impersonate import ImpersonateTarget
+    except ImportError:
+        return None
+
+    target = ImpersonateTarget("chrome")
+    try:
+        with YoutubeDL({"quiet": True, "no_warnings": True}) as ydl:
+            available = ydl._impersonate_target_available(target)
+    except Exception:
+        return None
+    return target if available else None
+
+
+@functools.lru_cache(maxsize=1)
+def _node_path() -> str | None:
+    """
+    node for yt-dlp's JS challenges; PATH is walked once per process.
+    """
+    import shutil
+
+    return shutil.which("node")
+
+
+@functools.lru_cache(maxsize=1)
+def _cookie_file() -> str | None:
+    """
+    cookies.txt path if the file exists - stat'ed once per process.
+    """
+    return str(_COOKIE_PATH) if _COOKIE_PATH.is_file() else None
+
+
+@functools.lru_cache(maxsize=1)
+def _po_token() -> str | None:
+    """
+    YTDLP_PO_TOKEN (see README), read once per process.
+    """
+    return os.environ.get("YTDLP_PO_TOKEN", "").strip() or None
+
+
+# Without a PO token the extractor args never change -> one frozen instance.
+# yt-dlp only reads them (traverse_obj + list()), tuples are fine.
+_EXTRACTOR_ARGS_NO_TOKEN = MappingProxyType({
+    "youtube": MappingProxyType({"player_client": _PLAYER_CLIENTS}),
+})
+
+
+@functools.lru_cache(maxsize=1)
+def _extractor_args() -> Mapping[str, Any]:
+    """
+    Frozen extractor_args shared by every opts dict of the process.
+    """
+    po_token = _po_token()
+    if not po_token:
+        return _EXTRACTOR_ARGS_NO_TOKEN
+    return MappingProxyType({
+        "youtube": MappingProxyType({"player_client": _PLAYER_CLIENTS, "po_token": (po_token,)}),
+    })
+
+
+def _reset_cache() -> None:
+    """
+    Forget cached environment lookups and opts templates
+    (e.g. after installing node or changing PATH mid-session).
+    """
+    _node_path.cache_clear()
+    _cookie_file.cache_clear()
+    _po_token.cache_clear()
+    _extractor_args.cache_clear()
+    _base_opts_template.cache_clear()
+
 
 def cookie_sources() -> list[tuple[str, ...]]:
     return [
@@ -15,67 +167,191 @@ def cookie_sources() -> list[tuple[str, ...]]:
     ]
 
 
-def build_base_opts(out_dir: Path, enable_cookies: bool = False) -> dict:
-    cookie_path = Path(__file__).with_name("cookies.txt")
-    po_token = os.environ.get("YTDLP_PO_TOKEN", "").strip()
+def build_base_opts(out_dir: Path, enable_cookies: bool = False, fast_names: bool = False) -> dict:
+    """
+    fast_names: name files "<id>.<ext>" - ids are already filesystem-safe, so
+    yt-dlp skips title sanitizing / trimming per item. The title is then not
+    part of the file name (it is still in the extracted info).
+    """
+    # Fresh top-level dict per call: callers add/replace keys freely,
+    # the cached template stays clean. Nested values are shared (read-only).
+    return _base_opts_template(str(out_dir), enable_cookies, fast_names).copy()
 
-    extractor_args = {
-        "youtube": {
-            "player_client": ["tv", "mweb", "tv_embedded"],
-        }
-    }
-    if po_token:
-        extractor_args["youtube"]["po_token"] = [po_token]
-
-    opts = {
-        "format": "bv*+ba/b",
-        "merge_output_format": "mp4",
-        "outtmpl": str(out_dir / "%(title)s [%(id)s].%(ext)s"),
-        "ignoreerrors": True,
-        "continuedl": True,
-        "retries": 10,
-        "fragment_retries": 10,
-        "concurrent_fragment_downloads": 4,
-        "nopart": False,
-        "noprogress": False,
-        "http_headers": {"User-Agent": "Mozilla/5.0"},
+
+# ------------------------------------------------------------
+# Optional / environment-dependent parts of the base opts.
+# Each returns {} or the keys it owns -> the template is one dict literal.
+# ------------------------------------------------------------
+def _names_entry(out_dir: Path, fast_names: bool) -> dict[str, Any]:
+    # "<dir>/<name>" without extension: per-format outtmpl is one f-string
+    if fast_names:
+        prefix = str(out_dir / "%(id)s")
+        return {"_outtmpl_prefix": prefix, "outtmpl": f"{prefix}.%(ext)s"}
+
+    prefix = str(out_dir / "%(title)s [%(id)s]")
+    return {
+        "_outtmpl_prefix": prefix,
+        "outtmpl": f"{prefix}.%(ext)s",
         "restrictfilenames": True,
         "trim_file_name": 200,
-        "extractor_args": extractor_args,
-        "remote_components": ["ejs:github"],
     }
 
-    node_path = shutil.which("node")
+
+def _tuning_entry() -> dict[str, Any]:
+    # Network tuning (README: "Tuning")
+    retries = _env_int("RIPBOX_RETRIES", 10, minimum=0)
+    entry: dict[str, Any] = {
+        # HLS/DASH fragments in flight at once, for every export (video and mp3)
+        "concurrent_fragment_downloads": _env_int("RIPBOX_FRAG_PAR", max(4, os.cpu_count() or 4)),
+        "retries": retries,
+        "fragment_retries": retries,
+    }
+    chunk = _env_size("RIPBOX_HTTP_CHUNK")
+    if chunk:
+        # ranged requests of this size -> sidesteps per-connection throttling
+        entry["http_chunk_size"] = chunk
+    return entry
+
+
+def _runtime_entry() -> dict[str, Any]:
+    # JS runtime for YouTube challenges + browser TLS fingerprint, when available
+    entry: dict[str, Any] = {}
+    node_path = _node_path()
     if node_path:
-        opts["js_runtimes"] = {"node": {"path": node_path}}
+        entry["js_runtimes"] = {"node": {"path": node_path}}
+
+    impersonate = _impersonate_target()
+    if impersonate is not None:
+        entry["impersonate"] = impersonate
+    return entry
+
+
+def _downloader_entry() -> dict[str, Any]:
+    import shutil  # only needed for the aria2c lookup
+
+    # Multi-connection downloads when aria2c is installed, native downloader otherwise
+    if not shutil.which("aria2c"):
+        return {}
+    return {
+        "external_downloader": {"default": "aria2c"},
+        "external_downloader_args": {"aria2c": list(_ARIA2C_ARGS)},
+    }
+
+
+def _cookie_entry(enable_cookies: bool) -> dict[str, Any]:
+    cookie_file = _cookie_file() if enable_cookies else None
+    return {"cookiefile": cookie_file} if cookie_file else {}
+
+
+@functools.lru_cache(maxsize=8)
+def _base_opts_template(out_dir_s: str, enable_cookies: bool, fast_names: bool = False) -> dict:
+    return {
+        **_BASE_TEMPLATE,
+        **_names_entry(Path(out_dir_s), fast_names),
+        "extractor_args": _extractor_args(),
+        **_tuning_entry(),
+        # Persistent yt-dlp cache (player JS / signature functions) next to the info
+        # cache; yt-dlp creates the directory itself on first write.
+        "cachedir": str(cache_root() / "yt-dlp"),
+        **_runtime_entry(),
+        **_downloader_entry(),
+        **_cookie_entry(enable_cookies),
+    }
+
+
+# ------------------------------------------------------------
+# Per-format option overlays
+# ------------------------------------------------------------
+# export ext -> (overlay chained over the base opts, ext baked into outtmpl)
+#
+# A None value means "key unset" (None-as-absent), e.g. mp3 drops
+# merge_output_format and videos never carry postprocessors.
+# mp3 keeps "%(ext)s" in outtmpl: FFmpegExtractAudio renames the file itself.
+# Unknown extensions fall back to mp4.
+#
+_VIDEO_FORMAT = "bv*+ba/b"
+
+_MP3_POSTPROCESSORS = (
+    {"key": "FFmpegExtractAudio", "preferredcodec": "mp3", "preferredquality": "0"},
+)
+
+
+def _video_overlay(ext: str) -> tuple[Mapping[str, Any], str]:
+    # mp4 / mkv / mov differ only in the merge container
+    return (
+        MappingProxyType({
+            "merge_output_format": ext,
+            "format": _VIDEO_FORMAT,
+            "postprocessors": None,
+        }),
+        ext,
+    )
+
+
+_FORMAT_OVERLAYS: dict[str, tuple[Mapping[str, Any], str | None]] = {
+    **{ext: _video_overlay(ext) for ext in VIDEO_EXTS},
+    "mp3": (
+        MappingProxyType({
+            "format": "bestaudio/best",
+            "merge_output_format": None,
+            "postprocessors": _MP3_POSTPROCESSORS,
+        }),
+        None,
+    ),
+}
+_DEFAULT_OVERLAY = _FORMAT_OVERLAYS["mp4"]
+
+
+# One entry per (template, ext) pair -> a long session turns every
+# str.replace scan into a dict lookup. Bounded in case folders change a lot.
+@functools.lru_cache(maxsize=64)
+def _subst_ext(tmpl: str, ext: str) -> str:
+    if "%(ext)s" in tmpl:
+        return tmpl.replace("%(ext)s", ext)
+    # template without an ext field would otherwise be silently left as-is
+    return f"{tmpl}.{ext}"
+
+
+def build_opts_for_format(base_opts: Mapping[str, Any], export_ext: str) -> ChainMap:
+    """
+    Per-format view over `base_opts` - nothing from the base is copied.
+
+    Lookups go outtmpl overlay -> format overlay -> base. A None value means "unset"
+    (e.g. mp3 drops merge_output_format); run_download() flattens the view
+    into a real dict without those keys before handing it to yt-dlp.
+    """
+    fmt_overlay, tmpl_ext = _FORMAT_OVERLAYS.get(export_ext, _DEFAULT_OVERLAY)
 
-    if enable_cookies:
-        if cookie_path.exists():
-            opts["cookiefile"] = str(cookie_path)
+    # fresh first map: writes through the view never touch the shared maps
+    overlay: dict = {}
+    if tmpl_ext:
+        prefix = base_opts.get("_outtmpl_prefix")
+        if prefix:
+            overlay["outtmpl"] = f"{prefix}.{tmpl_ext}"
+        else:
+            # base without the prefix key (custom outtmpl)
+            overlay["outtmpl"] = _subst_ext(base_opts["outtmpl"], tmpl_ext)
 
-    return opts
+    return ChainMap(overlay, fmt_overlay, base_opts)
 
 
-def build_opts_for_format(base_opts: dict, export_ext: str) -> dict:
-    opts = dict(base_opts)
+def build_opts_matrix(base_opts: Mapping[str, Any], exts: Sequence[str]) -> dict[str, ChainMap]:
+    """
+    {export ext: build_opts_for_format(base_opts, ext)} - every view chains to the
+    same base, so cookies / extractor_args / cachedir objects are shared, not copied.
+    """
+    return {ext: build_opts_for_format(base_opts, ext) for ext in dict.fromkeys(exts)}
 
-    if export_ext in ("mp4", "mkv", "mov"):
-        opts["merge_output_format"] = export_ext
-        opts["format"] = "bv*+ba/b"
-        opts["outtmpl"] = opts["outtmpl"].replace("%(ext)s", export_ext)
-        opts.pop("postprocessors", None)
 
-    elif export_ext == "mp3":
-        opts["format"] = "bestaudio/best"
-        opts.pop("merge_output_format", None)
-        opts["postprocessors"] = [
-            {"key": "FFmpegExtractAudio", "preferredcodec": "mp3", "preferredquality": "0"}
-        ]
+# Extraction-only pass: playlist entries stay unresolved (id / url only).
+# The download pass resolves each entry right before downloading it, so the
+# first download starts without waiting for the whole playlist.
+_PLANNING_OVERLAY = MappingProxyType({"extract_flat": "in_playlist"})
 
-    else:
-        opts["merge_output_format"] = "mp4"
-        opts["format"] = "bv*+ba/b"
-        opts["outtmpl"] = opts["outtmpl"].replace("%(ext)s", "mp4")
-        opts.pop("postprocessors", None)
 
-    return opts
+def build_planning_opts(base_opts: Mapping[str, Any]) -> ChainMap:
+    """
+    View over `base_opts` for the planning (extraction) pass.
+    Single videos come back fully extracted as before.
+    """
+    return ChainMap({}, _PLANNING_OVERLAY, base_opts)